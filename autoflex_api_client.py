@@ -5,15 +5,33 @@ This module provides a client class for interacting with the Autoflex10 API,
 handling authentication and API requests.
 """
 
+import json
+import logging
 import os
+import random
+import threading
 import time
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, ClassVar, Tuple, Iterator
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class AutoflexAPIClient:
     """
@@ -26,6 +44,39 @@ class AutoflexAPIClient:
     # Authentication base URL (different from API URL)
     AUTH_BASE_URL = "https://api.autoflex10.work/v2"
 
+    # Number of vehicle pages fetched concurrently during pagination; the
+    # first batch starts at PAGE_PREFETCH_START and doubles up to the limit
+    # so small inventories are not over-fetched past the last page
+    PAGE_PREFETCH = 8
+    PAGE_PREFETCH_START = 2
+
+    # Safety limit on the number of vehicle pages retrieved
+    MAX_PAGES = 100
+
+    # Fields requested from the vehicle endpoint by default
+    _DEFAULT_FIELDS: ClassVar[Tuple[str, ...]] = (
+        'vehicle_id',
+        'license_plate',
+        'purchase_price',
+        'brand',
+        'model',
+        'color',
+        'purchase_date',
+        'sell_price',
+        'is_sold'  # 1 = sold, 0 = not sold (read-only, set by Autoflex)
+    )
+    _DEFAULT_FIELDS_CSV: ClassVar[str] = ','.join(_DEFAULT_FIELDS)
+
+    # Seconds a vehicle fetched by get_vehicle is served from cache
+    VEHICLE_CACHE_TTL = 5.0
+
+    # Maximum number of cached vehicles
+    VEHICLE_CACHE_SIZE = 1024
+
+    # Authentication attempts and maximum backoff (seconds) when rate limited
+    MAX_AUTH_ATTEMPTS = 5
+    MAX_AUTH_BACKOFF = 30.0
+
     def __init__(
         self,
         api_key: Optional[str] = None,
@@ -51,21 +102,87 @@ class AutoflexAPIClient:
         )
 
         self.token: Optional[str] = None
+        self._cached_headers: Optional[Dict[str, str]] = None
         self.token_expiry: Optional[float] = None
         self.token_validity_duration = 1800  # 30 minutes in seconds
+        self._refresh_buffer = 60  # Refresh this many seconds before expiry
+        self._refresh_timer: Optional[threading.Timer] = None
+        self._token_lock = threading.RLock()
+        self._closed = False  # Set by close(); stops background refreshes
         self.api_url: Optional[str] = None  # Dynamic API URL from authentication
+        self._vehicle_url: Optional[str] = None  # Cached vehicle endpoint URL
         self.user_id: Optional[str] = None
 
+        # Recently fetched vehicles: vehicle_id -> (fetched_at, data)
+        self._vehicle_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+        # Persistent session so all requests reuse pooled keep-alive connections
+        self._session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+        self._session.mount(
+            'https://',
+            HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+        )
+
+    def close(self) -> None:
+        """
+        Close the underlying HTTP session and its pooled connections.
+        """
+        with self._token_lock:
+            self._closed = True
+            if self._refresh_timer is not None:
+                self._refresh_timer.cancel()
+                self._refresh_timer = None
+        self._session.close()
+
+    def __enter__(self) -> 'AutoflexAPIClient':
+        """Support use as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Close the session when leaving the context."""
+        self.close()
+
     def authenticate(self) -> bool:
         """
         Authenticate with the Autoflex10 API and obtain a token.
 
         Uses GET request with query parameters as per API specification.
-        Returns dynamic API URL for subsequent requests.
+        Returns dynamic API URL for subsequent requests. When the API asks
+        to retry (HTTP 202), waits with jittered exponential backoff for a
+        bounded number of attempts.
 
         Returns:
             True if authentication successful, False otherwise
         """
+        delay = 0.0
+
+        for attempt in range(self.MAX_AUTH_ATTEMPTS):
+            success, retry_after = self._authenticate_once()
+
+            if success:
+                return True
+
+            if retry_after is None or attempt == self.MAX_AUTH_ATTEMPTS - 1:
+                return False
+
+            delay = min(max(retry_after, delay * 2), self.MAX_AUTH_BACKOFF)
+            time.sleep(delay + random.uniform(0, delay * 0.25))
+
+        return False
+
+    def _authenticate_once(self) -> Tuple[bool, Optional[float]]:
+        """
+        Perform a single authentication request.
+
+        Returns:
+            Tuple of (success, retry_after) where retry_after is the number
+            of seconds to wait before retrying, or None if not retryable
+        """
         auth_url = f"{self.AUTH_BASE_URL}/authenticate"
         params = {
             'api_key': self.api_key,
@@ -77,86 +194,176 @@ class AutoflexAPIClient:
             params['organization_name'] = self.organization_name
 
         try:
-            response = requests.get(auth_url, params=params, timeout=15)
+            response = self._session.get(auth_url, params=params, timeout=15)
 
             if response.status_code == 200:
-                data = response.json()
+                data = _json_loads(response.content)
 
                 # Check for token in response
                 if 'token' in data:
-                    self.token = data['token']
-                    self.token_expiry = time.time() + self.token_validity_duration
-
-                    # Get dynamic API URL
-                    if 'api_url' in data:
-                        self.api_url = data['api_url']
-
-                    # Get user ID
-                    if 'user_id' in data:
-                        self.user_id = data['user_id']
-
-                    print(f"Authentication successful!")
-                    print(f"  Token: {self.token[:20]}...")
-                    print(f"  API URL: {self.api_url}")
-                    return True
-
-                print(f"Unexpected response structure: {data}")
-                return False
+                    with self._token_lock:
+                        self.token = data['token']
+                        self._cached_headers = {
+                            'token': self.token,
+                            'Content-Type': 'application/json'
+                        }
+                        # Jitter expiry so clients started together do not
+                        # all refresh at the same moment
+                        self.token_expiry = (
+                            time.time() + self.token_validity_duration -
+                            random.uniform(30, 120)
+                        )
+
+                        # Get dynamic API URL
+                        if 'api_url' in data:
+                            self.api_url = data['api_url']
+                        self._vehicle_url = f"{self.api_url}/vehicle"
+
+                        # Get user ID
+                        if 'user_id' in data:
+                            self.user_id = data['user_id']
+
+                        self._schedule_token_refresh()
+
+                    logger.info("Authentication successful!")
+                    logger.info(f"  Token: {self.token[:20]}...")
+                    logger.info(f"  API URL: {self.api_url}")
+                    return True, None
+
+                logger.error(f"Unexpected response structure: {data}")
+                return False, None
 
             elif response.status_code == 401:
-                print("Authentication failed: Invalid credentials")
-                return False
+                logger.error("Authentication failed: Invalid credentials")
+                return False, None
 
             elif response.status_code == 202:
                 # Retry required
-                data = response.json()
-                retry_ms = data.get('retry', 5000)
-                print(f"Rate limited. Retry in {retry_ms}ms")
-                return False
+                retry_after = self._get_retry_after(response)
+                logger.warning(
+                    f"Rate limited. Retry in {retry_after * 1000:.0f}ms"
+                )
+                return False, retry_after
 
             else:
-                print(f"Authentication failed with status {response.status_code}")
+                logger.error(
+                    f"Authentication failed with status {response.status_code}"
+                )
                 try:
-                    error_data = response.json()
-                    print(f"Error: {error_data}")
+                    error_data = _json_loads(response.content)
+                    logger.error(f"Error: {error_data}")
                 except ValueError:
-                    print(f"Response: {response.text}")
-                return False
+                    logger.error(
+                        "Response: "
+                        f"{response.content[:200].decode('utf-8', errors='replace')}"
+                    )
+                return False, None
 
         except requests.exceptions.RequestException as error:
-            print(f"Authentication request failed: {error}")
-            return False
+            logger.error(f"Authentication request failed: {error}")
+            return False, None
+        except ValueError as error:
+            logger.error(f"Authentication response is not valid JSON: {error}")
+            return False, None
 
-    def _ensure_authenticated(self) -> bool:
+    def _get_retry_after(self, response: requests.Response) -> float:
         """
-        Ensure we have a valid authentication token.
+        Determine how long to wait before retrying a 202 response.
+
+        Prefers the Retry-After header (seconds) and falls back to the
+        'retry' field (milliseconds) in the response body.
+
+        Args:
+            response: The HTTP response asking for a retry
+
+        Returns:
+            Number of seconds to wait
+        """
+        retry_header = response.headers.get('Retry-After')
+        if retry_header is not None:
+            try:
+                return float(retry_header)
+            except ValueError:
+                pass
+
+        try:
+            body = _json_loads(response.content)
+        except ValueError:
+            body = None
+
+        retry_ms = body.get('retry', 5000) if isinstance(body, dict) else 5000
+        try:
+            return float(retry_ms) / 1000
+        except (TypeError, ValueError):
+            return 5.0
+
+    def _schedule_token_refresh(self) -> None:
+        """
+        Schedule a background re-authentication shortly before the token expires.
+
+        Keeps the token fresh off the request path so API calls do not
+        stall on a synchronous authentication round-trip. Must be called
+        with _token_lock held so concurrent authentications replace the
+        timer one at a time.
+        """
+        if self._closed:
+            return
+
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+
+        delay = max(
+            self.token_expiry - 2 * self._refresh_buffer - time.time(),
+            0
+        )
+        self._refresh_timer = threading.Timer(delay, self.authenticate)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _is_token_valid(self) -> bool:
+        """
+        Check whether the current token is present and not about to expire.
+
+        Returns:
+            True if the token can be used, False if it needs a refresh
+        """
+        return (
+            self.token is not None and
+            self.token_expiry is not None and
+            time.time() < self.token_expiry - self._refresh_buffer
+        )
+
+    def ensure_authenticated(self) -> bool:
+        """
+        Ensure we have a valid authentication token, re-authenticating only
+        when the current token is missing or about to expire.
 
         Returns:
             True if authenticated, False otherwise
         """
-        current_time = time.time()
+        if self._is_token_valid():
+            return True
 
-        if (self.token is None or
-                self.token_expiry is None or
-                current_time >= self.token_expiry):
-            return self.authenticate()
+        with self._token_lock:
+            # Another thread may have refreshed the token while we waited
+            if self._is_token_valid():
+                return True
 
-        return True
+            return self.authenticate()
 
-    def _get_headers(self) -> Dict[str, str]:
+    def _get_headers(self) -> Optional[Dict[str, str]]:
         """
         Get headers for API requests including authentication token.
 
         Returns:
-            Dictionary of HTTP headers
+            Dictionary of HTTP headers or None if authentication failed
         """
-        if not self._ensure_authenticated():
-            raise ValueError("Authentication failed. Cannot make API request.")
+        if not self.ensure_authenticated():
+            logger.error("Authentication failed. Cannot make API request.")
+            return None
 
-        return {
-            'token': self.token,
-            'Content-Type': 'application/json'
-        }
+        # Rebuilt only when the token changes
+        return self._cached_headers
 
     def get(
         self,
@@ -173,31 +380,59 @@ class AutoflexAPIClient:
         Returns:
             JSON response data or None if request failed
         """
-        if not self.api_url:
-            if not self._ensure_authenticated():
-                return None
-
-        url = f"{self.api_url}{endpoint}"
         headers = self._get_headers()
+        if headers is None:
+            return None
+
+        return self._get_url(
+            f"{self.api_url}{endpoint}", endpoint, headers, params
+        )
 
+    def _get_url(
+        self,
+        url: str,
+        endpoint: str,
+        headers: Dict[str, str],
+        params: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Send a GET request to a fully built URL.
+
+        Args:
+            url: Absolute request URL
+            endpoint: Endpoint path used in log messages
+            headers: Request headers including the token
+            params: Optional query parameters
+
+        Returns:
+            JSON response data or None if request failed
+        """
         try:
-            response = requests.get(
+            response = self._session.get(
                 url,
                 headers=headers,
                 params=params,
                 timeout=15
             )
             response.raise_for_status()
-            return response.json()
+            return _json_loads(response.content)
 
         except requests.exceptions.RequestException as error:
-            print(f"GET request failed for {endpoint}: {error}")
+            logger.error(f"GET request failed for {endpoint}: {error}")
             if hasattr(error, 'response') and error.response is not None:
                 try:
-                    error_data = error.response.json()
-                    print(f"Error details: {error_data}")
+                    error_data = _json_loads(error.response.content)
+                    logger.error(f"Error details: {error_data}")
                 except ValueError:
-                    print(f"Error response: {error.response.text[:200]}")
+                    logger.error(
+                        "Error response: "
+                        f"{error.response.content[:200].decode('utf-8', errors='replace')}"
+                    )
+            return None
+        except ValueError as error:
+            logger.error(
+                f"GET response for {endpoint} is not valid JSON: {error}"
+            )
             return None
 
     def post(
@@ -215,31 +450,38 @@ class AutoflexAPIClient:
         Returns:
             JSON response data or None if request failed
         """
-        if not self.api_url:
-            if not self._ensure_authenticated():
-                return None
+        headers = self._get_headers()
+        if headers is None:
+            return None
 
         url = f"{self.api_url}{endpoint}"
-        headers = self._get_headers()
 
         try:
-            response = requests.post(
+            response = self._session.post(
                 url,
                 headers=headers,
-                json=data,
+                data=_json_dumps(data) if data is not None else None,
                 timeout=15
             )
             response.raise_for_status()
-            return response.json()
+            return _json_loads(response.content)
 
         except requests.exceptions.RequestException as error:
-            print(f"POST request failed for {endpoint}: {error}")
+            logger.error(f"POST request failed for {endpoint}: {error}")
             if hasattr(error, 'response') and error.response is not None:
                 try:
-                    error_data = error.response.json()
-                    print(f"Error details: {error_data}")
+                    error_data = _json_loads(error.response.content)
+                    logger.error(f"Error details: {error_data}")
                 except ValueError:
-                    print(f"Error response: {error.response.text[:200]}")
+                    logger.error(
+                        "Error response: "
+                        f"{error.response.content[:200].decode('utf-8', errors='replace')}"
+                    )
+            return None
+        except ValueError as error:
+            logger.error(
+                f"POST response for {endpoint} is not valid JSON: {error}"
+            )
             return None
 
     def get_vehicles(
@@ -257,24 +499,17 @@ class AutoflexAPIClient:
         Returns:
             Dictionary with vehicle data or None if request failed
         """
-        default_fields = [
-            'vehicle_id',
-            'license_plate',
-            'purchase_price',
-            'brand',
-            'model',
-            'color',
-            'purchase_date',
-            'sell_price',
-            'is_sold'  # 1 = sold, 0 = not sold (read-only, set by Autoflex)
-        ]
-
         params = {
-            'fields': ','.join(fields or default_fields),
+            'fields': ','.join(fields) if fields else self._DEFAULT_FIELDS_CSV,
             'page': page
         }
 
-        return self.get('/vehicle', params=params)
+        headers = self._get_headers()
+        if headers is None:
+            return None
+
+        # Called once per page; use the cached URL instead of self.get()
+        return self._get_url(self._vehicle_url, '/vehicle', headers, params)
 
     def get_all_vehicles(
         self,
@@ -290,36 +525,110 @@ class AutoflexAPIClient:
             List of vehicle dictionaries
         """
         all_vehicles = []
-        page = 1
-        has_next_page = True
 
-        while has_next_page:
-            result = self.get_vehicles(fields=fields, page=page)
+        for vehicles in self.iter_vehicle_pages(fields=fields):
+            all_vehicles.extend(vehicles)
 
-            if result is None:
-                break
+        return all_vehicles
 
-            vehicles = result.get('data', [])
-            all_vehicles.extend(vehicles)
+    def iter_vehicle_pages(
+        self,
+        fields: Optional[List[str]] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Iterate over pages of vehicles from Autoflex10 as they are retrieved.
 
-            has_next_page = result.get('nextpage', False)
-            page += 1
+        Following pages are prefetched concurrently, so callers can process
+        a page while the next ones are still being downloaded.
 
-            # Safety limit
-            if page > 100:
-                print("Warning: Reached page limit of 100")
-                break
+        Args:
+            fields: List of fields to include in response
 
-        return all_vehicles
+        Yields:
+            List of vehicle dictionaries for each page
+        """
+        # Fetch the first page sequentially (also authenticates)
+        result = self.get_vehicles(fields=fields, page=1)
+        if result is None:
+            return
+
+        yield result.get('data', [])
+        has_next_page = result.get('nextpage', False)
+        page = 2
+        batch_size = self.PAGE_PREFETCH_START
+
+        # Prefetch following pages in growing batches over the pooled session
+        with ThreadPoolExecutor(max_workers=self.PAGE_PREFETCH) as executor:
+            while has_next_page:
+                # Safety limit
+                if page > self.MAX_PAGES:
+                    logger.warning(
+                        f"Reached page limit of {self.MAX_PAGES}"
+                    )
+                    break
+
+                batch = range(
+                    page,
+                    min(page + batch_size, self.MAX_PAGES + 1)
+                )
+                results = executor.map(
+                    lambda batch_page: self.get_vehicles(
+                        fields=fields, page=batch_page
+                    ),
+                    batch
+                )
+
+                for result in results:
+                    if result is None:
+                        has_next_page = False
+                        break
+
+                    yield result.get('data', [])
+
+                    has_next_page = result.get('nextpage', False)
+                    if not has_next_page:
+                        break
+
+                page = batch.stop
+                batch_size = min(batch_size * 2, self.PAGE_PREFETCH)
 
     def get_vehicle(self, vehicle_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve a specific vehicle by ID.
 
+        Results are cached for VEHICLE_CACHE_TTL seconds so repeated views
+        of the same vehicle do not hit the API each time.
+
         Args:
             vehicle_id: The vehicle identifier
 
         Returns:
             Vehicle data dictionary or None if request failed
         """
-        return self.get(f'/vehicle/{vehicle_id}')
+        now = time.time()
+        cached = self._vehicle_cache.get(vehicle_id)
+        if cached is not None and now - cached[0] < self.VEHICLE_CACHE_TTL:
+            return cached[1]
+
+        data = self.get(f'/vehicle/{vehicle_id}')
+        if data is None:
+            return None
+
+        # Evict the oldest entry when the cache is full
+        if len(self._vehicle_cache) >= self.VEHICLE_CACHE_SIZE:
+            self._vehicle_cache.pop(next(iter(self._vehicle_cache)))
+
+        self._vehicle_cache[vehicle_id] = (now, data)
+        return data
+
+    def invalidate_vehicle_cache(self, vehicle_id: Optional[str] = None) -> None:
+        """
+        Drop cached vehicle data.
+
+        Args:
+            vehicle_id: Vehicle to invalidate, or None to clear the whole cache
+        """
+        if vehicle_id is None:
+            self._vehicle_cache.clear()
+        else:
+            self._vehicle_cache.pop(vehicle_id, None)
@@ -5,11 +5,56 @@ This module provides the main application class that orchestrates
 the integration between Autoflex10 API and the key slot management system.
 """
 
-from typing import Optional, Dict, Any, List
+import logging
+import sys
+from bisect import bisect_left
+from contextlib import nullcontext
+from operator import attrgetter
+from typing import Optional, Dict, Any, List, Tuple, Callable, ContextManager
 from autoflex_api_client import AutoflexAPIClient
-from key_slot_manager import KeySlotManager, SlotAssignment, SoldVehicle
+from key_slot_manager import (
+    KeySlotManager, SlotAssignment, SoldVehicle, normalize_plate
+)
 from slot_assignment_strategy import PriceBasedSlotStrategy
 
+logger = logging.getLogger(__name__)
+
+
+def _to_float(value: Any, default: float = 0.0) -> float:
+    """
+    Convert an API value to float without raising.
+
+    Args:
+        value: Raw value from the API (number, string or None)
+        default: Value returned when conversion is not possible
+
+    Returns:
+        The value as float, or default if it is missing or invalid
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    if isinstance(value, str) and value:
+        try:
+            return float(value)
+        except ValueError:
+            return default
+
+    return default
+
+
+def _to_bool_flag(value: Any) -> bool:
+    """
+    Interpret an API 0/1 flag (e.g. is_sold) as a boolean.
+
+    Args:
+        value: Raw flag value from the API
+
+    Returns:
+        True if the flag is set, False otherwise
+    """
+    return value == 1 or value == '1' or value is True
+
 
 class KeyManagementApp:
     """
@@ -58,6 +103,15 @@ class KeyManagementApp:
         """
         return self.api_client.authenticate()
 
+    def ensure_authenticated(self) -> bool:
+        """
+        Authenticate with the Autoflex10 API unless the token is still valid.
+
+        Returns:
+            True if authenticated, False otherwise
+        """
+        return self.api_client.ensure_authenticated()
+
     def process_new_vehicle(
         self,
         vehicle_id: str,
@@ -94,12 +148,14 @@ class KeyManagementApp:
         )
 
         if assigned_slot is not None:
-            print(
-                f"Vehicle {license_plate} assigned to slot {assigned_slot} "
-                f"(Price: €{purchase_price:,.2f})"
-            )
+            # Called per vehicle during sync; skip formatting unless enabled
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"Vehicle {license_plate} assigned to slot {assigned_slot} "
+                    f"(Price: €{purchase_price:,.2f})"
+                )
         else:
-            print(
+            logger.warning(
                 f"Failed to assign vehicle {license_plate}: "
                 "No available slots"
             )
@@ -148,12 +204,12 @@ class KeyManagementApp:
         )
 
         if slot is not None:
-            print(
+            logger.info(
                 f"✓ Vehicle {license_plate} manually added to slot {slot} "
                 f"(Price: €{purchase_price:,.2f})"
             )
         else:
-            print(f"✗ Failed to add vehicle {license_plate}")
+            logger.error(f"✗ Failed to add vehicle {license_plate}")
 
         return slot
 
@@ -178,12 +234,21 @@ class KeyManagementApp:
         if buyer_name:
             buyer_info = {'name': buyer_name}
 
-        return self.slot_manager.mark_vehicle_as_sold(
+        assignment = self.slot_manager.get_vehicle_by_license_plate(
+            license_plate
+        )
+
+        success = self.slot_manager.mark_vehicle_as_sold(
             license_plate=license_plate,
             sold_price=sold_price,
             buyer_info=buyer_info
         )
 
+        if success:
+            self.api_client.invalidate_vehicle_cache(assignment.vehicle_id)
+
+        return success
+
     def complete_handover(self, license_plate: str) -> bool:
         """
         Complete the handover of a sold vehicle.
@@ -195,7 +260,14 @@ class KeyManagementApp:
         Returns:
             True if successful, False otherwise
         """
-        return self.slot_manager.complete_vehicle_handover(license_plate)
+        sold = self.slot_manager.get_sold_by_license_plate(license_plate)
+
+        success = self.slot_manager.complete_vehicle_handover(license_plate)
+
+        if success:
+            self.api_client.invalidate_vehicle_cache(sold.vehicle_id)
+
+        return success
 
     def get_sold_vehicles(self) -> List[SoldVehicle]:
         """
@@ -229,121 +301,187 @@ class KeyManagementApp:
             }
 
         # Check in sold vehicles
-        for sold in self.slot_manager.sold_vehicles:
-            if sold is not None:
-                normalized_search = license_plate.upper().replace(" ", "").replace("-", "")
-                normalized_plate = sold.license_plate.upper().replace(" ", "").replace("-", "")
-                if normalized_search == normalized_plate:
-                    return {
-                        'status': 'sold',
-                        'sold_slot': sold.sold_slot,
-                        'original_slot': sold.original_slot,
-                        'license_plate': sold.license_plate,
-                        'purchase_price': sold.purchase_price,
-                        'sold_at': sold.sold_at.isoformat(),
-                        'sold_price': sold.sold_price
-                    }
+        sold = self.slot_manager.get_sold_by_license_plate(license_plate)
+        if sold is not None:
+            return {
+                'status': 'sold',
+                'sold_slot': sold.sold_slot,
+                'original_slot': sold.original_slot,
+                'license_plate': sold.license_plate,
+                'purchase_price': sold.purchase_price,
+                'sold_at': sold.sold_at.isoformat(),
+                'sold_price': sold.sold_price
+            }
 
         return None
 
-    def sync_vehicles_from_autoflex(self) -> Dict[str, Any]:
+    def sync_vehicles_from_autoflex(
+        self,
+        page_lock: Optional[Callable[[], ContextManager[Any]]] = None
+    ) -> Dict[str, Any]:
         """
         Synchronize vehicles from Autoflex10 and assign them to slots.
         Automatically detects sold vehicles and moves them to sold slots.
 
+        Args:
+            page_lock: Optional factory for a context manager held while
+                each page is applied; pages are fetched outside it
+
         Returns:
             Dictionary with sync results including added, sold, and skipped counts
         """
-        # Get all vehicles with pagination
-        vehicles = self.api_client.get_all_vehicles()
-
-        if not vehicles:
-            print("No vehicles found or failed to retrieve from Autoflex10")
-            return {
-                'total': 0,
-                'added': 0,
-                'sold_detected': 0,
-                'skipped': 0,
-                'results': []
-            }
-
-        print(f"Found {len(vehicles)} vehicles in Autoflex10")
         results = []
+        total_count = 0
         added_count = 0
         sold_detected_count = 0
         skipped_count = 0
 
-        for vehicle in vehicles:
-            vehicle_id = vehicle.get('vehicle_id')
-            license_plate = vehicle.get('license_plate')
-            purchase_price = vehicle.get('purchase_price')
-            is_sold = vehicle.get('is_sold', 0)
+        lock = page_lock or nullcontext
+        slot_manager = self.slot_manager
+
+        # Process each page while the following pages are still being fetched
+        for vehicles in self.api_client.iter_vehicle_pages():
+            with lock():
+                total_count += len(vehicles)
+
+                # New vehicles on this page, assigned together with bulk_assign
+                new_vehicles = []
+                pending_plates = set()
+
+                for vehicle in vehicles:
+                    vehicle_id = vehicle.get('vehicle_id')
+                    license_plate = vehicle.get('license_plate')
+
+                    if not vehicle_id or not license_plate:
+                        continue
+
+                    normalized = normalize_plate(license_plate)
+
+                    # Check if vehicle is marked as sold in Autoflex
+                    is_sold = _to_bool_flag(vehicle.get('is_sold'))
+
+                    if normalized in pending_plates or (
+                        is_sold and
+                        slot_manager.get_vehicle_by_license_plate(license_plate)
+                    ):
+                        # Place the queued vehicles before a sale can free a
+                        # slot for them or a repeated plate is looked up, so
+                        # the feed is applied in Autoflex order
+                        added_count += self._assign_new_vehicles(
+                            new_vehicles, results
+                        )
+                        new_vehicles = []
+                        pending_plates.clear()
+
+                    # Check if vehicle already exists in system (both slots and
+                    # sold); the manager's plate index makes these O(1)
+                    existing = slot_manager.get_vehicle_by_license_plate(
+                        license_plate
+                    )
+                    exists_anywhere = (
+                        existing is not None or
+                        slot_manager.is_duplicate_license_plate(license_plate)
+                    )
+
+                    if is_sold:
+                        # Vehicle is sold in Autoflex
+                        if existing is not None:
+                            # Move to sold slots if not already there
+                            success = slot_manager.mark_vehicle_as_sold(
+                                license_plate=license_plate
+                            )
+                            if success:
+                                sold_detected_count += 1
+                                results.append({
+                                    'vehicle_id': vehicle_id,
+                                    'license_plate': license_plate,
+                                    'action': 'sold_detected',
+                                    'success': True
+                                })
+                            else:
+                                results.append({
+                                    'vehicle_id': vehicle_id,
+                                    'license_plate': license_plate,
+                                    'action': 'sold_failed',
+                                    'success': False
+                                })
+                        elif exists_anywhere:
+                            # Already sold and in sold_vehicles, skip
+                            skipped_count += 1
+                        else:
+                            # Already sold and not in system, skip
+                            skipped_count += 1
+                        continue
+
+                    # Vehicle not sold - assign to slot if not already assigned
+                    if exists_anywhere:
+                        skipped_count += 1
+                        continue
+
+                    # Handle None or invalid purchase_price (new vehicles only)
+                    purchase_price = _to_float(vehicle.get('purchase_price'))
+
+                    new_vehicles.append((vehicle, purchase_price))
+                    pending_plates.add(normalized)
+
+                added_count += self._assign_new_vehicles(new_vehicles, results)
+
+        if total_count == 0:
+            logger.warning(
+                "No vehicles found or failed to retrieve from Autoflex10"
+            )
+        else:
+            logger.info(f"Found {total_count} vehicles in Autoflex10")
 
-            if not vehicle_id or not license_plate:
-                continue
+        return {
+            'total': total_count,
+            'added': added_count,
+            'sold_detected': sold_detected_count,
+            'skipped': skipped_count,
+            'results': results
+        }
 
-            # Handle None or invalid purchase_price
-            if purchase_price is None:
-                purchase_price = 0.0
-            else:
-                try:
-                    purchase_price = float(purchase_price)
-                except (ValueError, TypeError):
-                    purchase_price = 0.0
-
-            # Check if vehicle is marked as sold in Autoflex
-            try:
-                is_sold = int(is_sold) == 1
-            except (ValueError, TypeError):
-                is_sold = False
-
-            # Check if vehicle already exists in system (both slots and sold)
-            existing = self.slot_manager.get_vehicle_by_license_plate(license_plate)
-            exists_anywhere = self.slot_manager.vehicle_exists_anywhere(license_plate)
-
-            if is_sold:
-                # Vehicle is sold in Autoflex
-                if existing is not None:
-                    # Move to sold slots if not already there
-                    success = self.slot_manager.mark_vehicle_as_sold(
-                        license_plate=license_plate
-                    )
-                    if success:
-                        sold_detected_count += 1
-                        results.append({
-                            'vehicle_id': vehicle_id,
-                            'license_plate': license_plate,
-                            'action': 'sold_detected',
-                            'success': True
-                        })
-                    else:
-                        results.append({
-                            'vehicle_id': vehicle_id,
-                            'license_plate': license_plate,
-                            'action': 'sold_failed',
-                            'success': False
-                        })
-                elif exists_anywhere:
-                    # Already sold and in sold_vehicles, skip
-                    skipped_count += 1
-                else:
-                    # Already sold and not in system, skip
-                    skipped_count += 1
-                continue
-
-            # Vehicle not sold - assign to slot if not already assigned
-            if exists_anywhere:
-                skipped_count += 1
-                continue
-
-            assigned_slot = self.process_new_vehicle(
-                vehicle_id=vehicle_id,
-                license_plate=license_plate,
-                purchase_price=purchase_price,
-                vehicle_data=vehicle
+    def _assign_new_vehicles(
+        self,
+        new_vehicles: List[Tuple[Dict[str, Any], float]],
+        results: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Assign a batch of new Autoflex vehicles to slots.
+
+        Args:
+            new_vehicles: List of (vehicle, purchase price)
+            results: Sync result list, extended in place
+
+        Returns:
+            Number of vehicles that were assigned a slot
+        """
+        if not new_vehicles:
+            return 0
+
+        assigned_slots = self.slot_manager.bulk_assign(
+            (
+                vehicle['vehicle_id'],
+                vehicle['license_plate'],
+                purchase_price,
+                vehicle
             )
+            for vehicle, purchase_price in new_vehicles
+        )
+
+        added_count = 0
+        for (vehicle, purchase_price), assigned_slot in zip(
+            new_vehicles, assigned_slots
+        ):
+            vehicle_id = vehicle['vehicle_id']
+            license_plate = vehicle['license_plate']
 
             if assigned_slot is not None:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        f"Vehicle {license_plate} assigned to slot "
+                        f"{assigned_slot} (Price: €{purchase_price:,.2f})"
+                    )
                 added_count += 1
                 results.append({
                     'vehicle_id': vehicle_id,
@@ -353,6 +491,10 @@ class KeyManagementApp:
                     'success': True
                 })
             else:
+                logger.warning(
+                    f"Failed to assign vehicle {license_plate}: "
+                    "No available slots"
+                )
                 results.append({
                     'vehicle_id': vehicle_id,
                     'license_plate': license_plate,
@@ -360,13 +502,7 @@ class KeyManagementApp:
                     'success': False
                 })
 
-        return {
-            'total': len(vehicles),
-            'added': added_count,
-            'sold_detected': sold_detected_count,
-            'skipped': skipped_count,
-            'results': results
-        }
+        return added_count
 
     def get_slot_status(self, slot_number: int) -> Optional[Dict[str, Any]]:
         """
@@ -423,62 +559,59 @@ class KeyManagementApp:
         assignments = self.slot_manager.get_all_assignments()
         sold = self.slot_manager.get_sold_vehicles()
 
-        # Group by slot range
-        high_price = []
-        medium_price = []
-        low_price = []
+        # Sort once, then split into slot ranges at the tier boundaries
+        all_sorted = sorted(assignments, key=attrgetter('slot_number'))
+        slot_numbers = [a.slot_number for a in all_sorted]
+        i50 = bisect_left(slot_numbers, 50)
+        i100 = bisect_left(slot_numbers, 100)
 
-        for a in assignments:
-            if a.slot_number < 50:
-                high_price.append(a)
-            elif a.slot_number < 100:
-                medium_price.append(a)
-            else:
-                low_price.append(a)
-
-        print("\n" + "=" * 80)
-        print("OVERZICHT SLOT TOEWIJZINGEN")
-        print("=" * 80)
-
-        print(f"\n📦 SLOTS 0-49 (Premium > €3000): {len(high_price)} voertuigen")
-        print("-" * 80)
-        for a in sorted(high_price, key=lambda x: x.slot_number):
-            print(
-                f"  Slot {a.slot_number:3d} | {a.license_plate:12s} | "
-                f"€{a.purchase_price:,.2f}"
-            )
-
-        print(f"\n📦 SLOTS 50-99 (Midden €1500-3000): {len(medium_price)} voertuigen")
-        print("-" * 80)
-        for a in sorted(medium_price, key=lambda x: x.slot_number):
-            print(
-                f"  Slot {a.slot_number:3d} | {a.license_plate:12s} | "
-                f"€{a.purchase_price:,.2f}"
-            )
+        sections = (
+            ("SLOTS 0-49 (Premium > €3000)", all_sorted[:i50]),
+            ("SLOTS 50-99 (Midden €1500-3000)", all_sorted[i50:i100]),
+            ("SLOTS 100-199 (Budget < €1500)", all_sorted[i100:]),
+        )
 
-        print(f"\n📦 SLOTS 100-199 (Budget < €1500): {len(low_price)} voertuigen")
-        print("-" * 80)
-        for a in sorted(low_price, key=lambda x: x.slot_number):
-            print(
+        lines = [
+            "",
+            "=" * 80,
+            "OVERZICHT SLOT TOEWIJZINGEN",
+            "=" * 80,
+        ]
+
+        for title, tier in sections:
+            lines.append(f"\n📦 {title}: {len(tier)} voertuigen")
+            lines.append("-" * 80)
+            lines.extend(
                 f"  Slot {a.slot_number:3d} | {a.license_plate:12s} | "
                 f"€{a.purchase_price:,.2f}"
+                for a in tier
             )
 
         if sold:
-            print(f"\n🚗 VERKOCHT (wachtend op overdracht): {len(sold)} voertuigen")
-            print("-" * 80)
+            lines.append(
+                f"\n🚗 VERKOCHT (wachtend op overdracht): {len(sold)} voertuigen"
+            )
+            lines.append("-" * 80)
             for s in sold:
                 sold_price_str = (
                     f"€{s.sold_price:,.2f}" if s.sold_price else "N/A"
                 )
-                print(
+                lines.append(
                     f"  Slot {s.sold_slot:3s} | {s.license_plate:12s} | "
                     f"Verkocht: {sold_price_str} | Was slot: {s.original_slot}"
                 )
 
-        print("\n" + "=" * 80)
         status = self.get_system_status()
-        print(f"TOTAAL: {status['occupied_slots']} bezet / {status['total_slots']} slots")
-        print(f"BESCHIKBAAR: {status['available_slots']} slots")
-        print(f"VERKOCHT (wachtend): {status['sold_vehicles_pending']} / 10 slots")
-        print("=" * 80)
+        lines.append("\n" + "=" * 80)
+        lines.append(
+            f"TOTAAL: {status['occupied_slots']} bezet / {status['total_slots']} slots"
+        )
+        lines.append(f"BESCHIKBAAR: {status['available_slots']} slots")
+        lines.append(
+            f"VERKOCHT (wachtend): {status['sold_vehicles_pending']} / 10 slots"
+        )
+        lines.append("=" * 80)
+
+        # Single write instead of one print per line
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
@@ -5,13 +5,40 @@ This module manages the 200 key slots and their assignments to vehicles.
 Includes support for sold vehicles and overflow slot assignment.
 """
 
-from typing import Optional, Dict, Any, List
+import logging
+from typing import Optional, Dict, Any, List, Tuple, Iterable
 from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
+from sortedcontainers import SortedList
 from slot_assignment_strategy import SlotAssignmentStrategy
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+
+# Strips spaces and dashes and uppercases ASCII letters in a single pass
+_PLATE_TRANS = str.maketrans(
+    {**{c: c.upper() for c in 'abcdefghijklmnopqrstuvwxyz'}, ' ': None, '-': None}
+)
+
+
+@lru_cache(maxsize=8192)
+def normalize_plate(license_plate: str) -> str:
+    """
+    Normalize license plate for consistent comparison.
+
+    Args:
+        license_plate: The license plate to normalize
+
+    Returns:
+        Normalized license plate (uppercase, no spaces or dashes)
+    """
+    normalized = license_plate.translate(_PLATE_TRANS)
+    # The table only covers ASCII; fall back to full case mapping otherwise
+    return normalized if normalized.isascii() else normalized.upper()
+
+
+@dataclass(frozen=True, slots=True)
 class SlotAssignment:
     """
     Represents an assignment of a vehicle to a key slot.
@@ -23,9 +50,16 @@ class SlotAssignment:
     purchase_price: float
     assigned_at: datetime
     vehicle_data: Optional[Dict[str, Any]] = None
+    normalized_plate: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Cache the normalized license plate for lookups."""
+        object.__setattr__(
+            self, 'normalized_plate', normalize_plate(self.license_plate)
+        )
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SoldVehicle:
     """
     Represents a sold vehicle awaiting key handover.
@@ -40,6 +74,13 @@ class SoldVehicle:
     sold_price: Optional[float] = None
     buyer_info: Optional[Dict[str, Any]] = None
     vehicle_data: Optional[Dict[str, Any]] = None
+    normalized_plate: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Cache the normalized license plate for lookups."""
+        object.__setattr__(
+            self, 'normalized_plate', normalize_plate(self.license_plate)
+        )
 
 
 class KeySlotManager:
@@ -71,17 +112,26 @@ class KeySlotManager:
         self.assignment_strategy = assignment_strategy
 
         # Main inventory slots (0 to total_slots-1)
-        self.slots: Dict[int, Optional[SlotAssignment]] = {
-            slot: None for slot in range(total_slots)
-        }
+        self.slots: List[Optional[SlotAssignment]] = [None] * total_slots
 
         # Sold vehicles slots (separate from main inventory)
         self.sold_vehicles: List[Optional[SoldVehicle]] = [
             None for _ in range(self.SOLD_VEHICLE_SLOTS)
         ]
 
-        # Index for quick license plate lookup
-        self._license_plate_index: Dict[str, int] = {}
+        # Occupied sold slots in slot order, without the empty entries
+        self._sold_dense: List[SoldVehicle] = []
+
+        # Index for quick license plate lookup:
+        # normalized plate -> ("slot", slot_number) or ("sold", sold index)
+        self._license_plate_index: Dict[str, Tuple[str, int]] = {}
+
+        # Running counts of occupied main slots and sold vehicles
+        self._occupied = 0
+        self._sold_count = 0
+
+        # Sorted set of free main slots for range and highest-free queries
+        self._free = SortedList(range(total_slots))
 
     def _normalize_license_plate(self, license_plate: str) -> str:
         """
@@ -93,7 +143,26 @@ class KeySlotManager:
         Returns:
             Normalized license plate (uppercase, no spaces)
         """
-        return license_plate.upper().replace(" ", "").replace("-", "")
+        return normalize_plate(license_plate)
+
+    def _find_location(self, license_plate: str, kind: str) -> Optional[int]:
+        """
+        Look up where a license plate is stored using the plate index.
+
+        Args:
+            license_plate: The license plate to search for
+            kind: "slot" for main slots or "sold" for sold vehicle slots
+
+        Returns:
+            Slot number or sold slot index, or None if not stored there
+        """
+        location = self._license_plate_index.get(
+            self._normalize_license_plate(license_plate)
+        )
+        if location is None or location[0] != kind:
+            return None
+
+        return location[1]
 
     def is_duplicate_license_plate(self, license_plate: str) -> bool:
         """
@@ -105,25 +174,10 @@ class KeySlotManager:
         Returns:
             True if duplicate exists, False otherwise
         """
-        normalized = self._normalize_license_plate(license_plate)
-
-        # Check in main slots
-        for assignment in self.slots.values():
-            if assignment is not None:
-                if self._normalize_license_plate(
-                    assignment.license_plate
-                ) == normalized:
-                    return True
-
-        # Check in sold vehicles
-        for sold in self.sold_vehicles:
-            if sold is not None:
-                if self._normalize_license_plate(
-                    sold.license_plate
-                ) == normalized:
-                    return True
-
-        return False
+        return (
+            self._normalize_license_plate(license_plate) in
+            self._license_plate_index
+        )
 
     def is_slot_available(self, slot_number: int) -> bool:
         """
@@ -155,9 +209,10 @@ class KeySlotManager:
         Returns:
             Available slot number or None if no slot is available
         """
-        for slot in range(min_slot, min(max_slot + 1, self.total_slots)):
-            if self.is_slot_available(slot):
-                return slot
+        idx = self._free.bisect_left(min_slot)
+
+        if idx < len(self._free) and self._free[idx] <= max_slot:
+            return self._free[idx]
 
         return None
 
@@ -168,10 +223,7 @@ class KeySlotManager:
         Returns:
             Highest available slot number or None if all slots are full
         """
-        for slot in range(self.total_slots - 1, -1, -1):
-            if self.is_slot_available(slot):
-                return slot
-        return None
+        return self._free[-1] if self._free else None
 
     def assign_vehicle_to_slot(
         self,
@@ -203,17 +255,49 @@ class KeySlotManager:
         if check_duplicate and self.is_duplicate_license_plate(license_plate):
             return False
 
+        self._assign_unchecked(
+            slot_number, vehicle_id, license_plate, purchase_price, vehicle_data
+        )
+        return True
+
+    def _assign_unchecked(
+        self,
+        slot_number: int,
+        vehicle_id: str,
+        license_plate: str,
+        purchase_price: float,
+        vehicle_data: Optional[Dict[str, Any]] = None,
+        assigned_at: Optional[datetime] = None
+    ) -> None:
+        """
+        Assign a vehicle to a slot without availability or duplicate checks.
+
+        Callers must already have verified that the slot is free and the
+        license plate is not in the system.
+
+        Args:
+            slot_number: The slot number to assign
+            vehicle_id: The vehicle identifier
+            license_plate: The license plate number
+            purchase_price: The purchase price of the vehicle
+            vehicle_data: Optional additional vehicle data
+            assigned_at: Assignment time (defaults to now)
+        """
         assignment = SlotAssignment(
             slot_number=slot_number,
             vehicle_id=vehicle_id,
             license_plate=license_plate,
             purchase_price=purchase_price,
-            assigned_at=datetime.now(),
+            assigned_at=assigned_at or datetime.now(),
             vehicle_data=vehicle_data
         )
 
         self.slots[slot_number] = assignment
-        return True
+        self._free.remove(slot_number)
+        self._occupied += 1
+        self._license_plate_index[assignment.normalized_plate] = (
+            "slot", slot_number
+        )
 
     def assign_vehicle(
         self,
@@ -239,40 +323,93 @@ class KeySlotManager:
         if self.is_duplicate_license_plate(license_plate):
             return None
 
+        return self._place_vehicle(
+            vehicle_id, license_plate, purchase_price, vehicle_data
+        )
+
+    def bulk_assign(
+        self,
+        vehicles: Iterable[Tuple[str, str, float, Optional[Dict[str, Any]]]]
+    ) -> List[Optional[int]]:
+        """
+        Assign a batch of vehicles to slots based on the assignment strategy.
+
+        Duplicates (plates already in the system or repeated within the
+        batch) are filtered out in a single pass before any slot is assigned.
+
+        Args:
+            vehicles: Iterable of (vehicle_id, license_plate, purchase_price,
+                vehicle_data) tuples
+
+        Returns:
+            Assigned slot number (or None) for each vehicle, in input order
+        """
+        batch = list(vehicles)
+        seen = set()
+        new_vehicles = []
+
+        for idx, vehicle in enumerate(batch):
+            normalized = self._normalize_license_plate(vehicle[1])
+            if normalized in self._license_plate_index or normalized in seen:
+                continue
+            seen.add(normalized)
+            new_vehicles.append((idx, vehicle))
+
+        # One timestamp for the whole batch
+        assigned_at = datetime.now()
+
+        assigned_slots: List[Optional[int]] = [None] * len(batch)
+        for idx, vehicle in new_vehicles:
+            assigned_slots[idx] = self._place_vehicle(
+                *vehicle, assigned_at=assigned_at
+            )
+
+        return assigned_slots
+
+    def _place_vehicle(
+        self,
+        vehicle_id: str,
+        license_plate: str,
+        purchase_price: float,
+        vehicle_data: Optional[Dict[str, Any]] = None,
+        assigned_at: Optional[datetime] = None
+    ) -> Optional[int]:
+        """
+        Place a vehicle already known not to be a duplicate into a slot.
+
+        Args:
+            vehicle_id: The vehicle identifier
+            license_plate: The license plate number
+            purchase_price: The purchase price of the vehicle
+            vehicle_data: Optional additional vehicle data
+            assigned_at: Assignment time (defaults to now)
+
+        Returns:
+            Assigned slot number or None if no slot available
+        """
         if self.assignment_strategy is None:
             # Fallback: assign to first available slot
-            for slot in range(self.total_slots):
-                if self.is_slot_available(slot):
-                    if self.assign_vehicle_to_slot(
-                        slot, vehicle_id, license_plate,
-                        purchase_price, vehicle_data, check_duplicate=False
-                    ):
-                        return slot
+            slot = self._free[0] if self._free else None
+        else:
+            # Try to assign in preferred range based on price
+            min_slot, max_slot = self.assignment_strategy.get_slot_range(
+                purchase_price
+            )
+            slot = self.get_available_slot_in_range(min_slot, max_slot)
+
+            # Overflow: if preferred range is full, find highest available slot
+            if slot is None:
+                slot = self.get_highest_available_slot()
+
+        if slot is None:
             return None
 
-        # Try to assign in preferred range based on price
-        min_slot, max_slot = self.assignment_strategy.get_slot_range(
-            purchase_price
+        # Slot comes from the free set and the plate was checked by the caller
+        self._assign_unchecked(
+            slot, vehicle_id, license_plate, purchase_price, vehicle_data,
+            assigned_at
         )
-        available_slot = self.get_available_slot_in_range(min_slot, max_slot)
-
-        if available_slot is not None:
-            if self.assign_vehicle_to_slot(
-                available_slot, vehicle_id, license_plate,
-                purchase_price, vehicle_data, check_duplicate=False
-            ):
-                return available_slot
-
-        # Overflow: if preferred range is full, find highest available slot
-        highest_slot = self.get_highest_available_slot()
-        if highest_slot is not None:
-            if self.assign_vehicle_to_slot(
-                highest_slot, vehicle_id, license_plate,
-                purchase_price, vehicle_data, check_duplicate=False
-            ):
-                return highest_slot
-
-        return None
+        return slot
 
     def add_vehicle_manually(
         self,
@@ -297,7 +434,9 @@ class KeySlotManager:
         """
         # Check for duplicate
         if self.is_duplicate_license_plate(license_plate):
-            print(f"Error: Vehicle with plate {license_plate} already exists")
+            logger.error(
+                f"Vehicle with plate {license_plate} already exists"
+            )
             return None
 
         # Generate vehicle ID if not provided
@@ -307,14 +446,14 @@ class KeySlotManager:
         # If preferred slot is specified, try that first
         if preferred_slot is not None:
             if self.is_slot_available(preferred_slot):
-                if self.assign_vehicle_to_slot(
+                self._assign_unchecked(
                     preferred_slot, vehicle_id, license_plate,
-                    purchase_price, vehicle_data, check_duplicate=False
-                ):
-                    return preferred_slot
+                    purchase_price, vehicle_data
+                )
+                return preferred_slot
             else:
-                print(
-                    f"Warning: Preferred slot {preferred_slot} not available, "
+                logger.warning(
+                    f"Preferred slot {preferred_slot} not available, "
                     "assigning automatically"
                 )
 
@@ -344,7 +483,7 @@ class KeySlotManager:
         assignment = self.get_vehicle_by_license_plate(license_plate)
 
         if assignment is None:
-            print(f"Error: Vehicle with plate {license_plate} not found")
+            logger.error(f"Vehicle with plate {license_plate} not found")
             return False
 
         # Find available sold vehicle slot
@@ -355,8 +494,8 @@ class KeySlotManager:
                 break
 
         if sold_slot_index is None:
-            print(
-                "Error: No available slots for sold vehicles. "
+            logger.error(
+                "No available slots for sold vehicles. "
                 "Please complete pending handovers."
             )
             return False
@@ -376,12 +515,21 @@ class KeySlotManager:
         )
 
         # Move to sold vehicles
+        self._sold_dense.insert(
+            self._sold_dense_position(sold_slot_index), sold_vehicle
+        )
         self.sold_vehicles[sold_slot_index] = sold_vehicle
+        self._license_plate_index[sold_vehicle.normalized_plate] = (
+            "sold", sold_slot_index
+        )
 
         # Release the original slot
         self.slots[assignment.slot_number] = None
+        self._occupied -= 1
+        self._sold_count += 1
+        self._free.add(assignment.slot_number)
 
-        print(
+        logger.info(
             f"Vehicle {license_plate} marked as sold. "
             f"Key moved from slot {assignment.slot_number} to sold slot {sold_slot_name}."
         )
@@ -397,31 +545,65 @@ class KeySlotManager:
         Returns:
             True if successful, False otherwise
         """
-        normalized = self._normalize_license_plate(license_plate)
+        sold_index = self._find_location(license_plate, "sold")
 
-        for idx, sold in enumerate(self.sold_vehicles):
-            if sold is not None:
-                if self._normalize_license_plate(
-                    sold.license_plate
-                ) == normalized:
-                    self.sold_vehicles[idx] = None
-                    print(
-                        f"Handover completed for {license_plate}. "
-                        "Key removed from system."
-                    )
-                    return True
-
-        print(f"Error: Vehicle {license_plate} not found in sold vehicles")
-        return False
+        if sold_index is None:
+            logger.error(f"Vehicle {license_plate} not found in sold vehicles")
+            return False
+
+        sold = self.sold_vehicles[sold_index]
+        del self._license_plate_index[sold.normalized_plate]
+        del self._sold_dense[self._sold_dense_position(sold_index)]
+        self.sold_vehicles[sold_index] = None
+        self._sold_count -= 1
+
+        logger.info(
+            f"Handover completed for {license_plate}. "
+            "Key removed from system."
+        )
+        return True
+
+    def _sold_dense_position(self, sold_index: int) -> int:
+        """
+        Get the position in the dense sold list for a sold slot.
+
+        Args:
+            sold_index: Index into sold_vehicles
+
+        Returns:
+            Number of occupied sold slots before sold_index
+        """
+        return sum(v is not None for v in self.sold_vehicles[:sold_index])
+
+    def get_sold_by_license_plate(
+        self,
+        license_plate: str
+    ) -> Optional[SoldVehicle]:
+        """
+        Find a sold vehicle awaiting handover by license plate.
+
+        Args:
+            license_plate: The license plate to search for
+
+        Returns:
+            SoldVehicle object or None if not found
+        """
+        sold_index = self._find_location(license_plate, "sold")
+        if sold_index is None:
+            return None
+
+        return self.sold_vehicles[sold_index]
 
     def get_sold_vehicles(self) -> List[SoldVehicle]:
         """
         Get list of all sold vehicles awaiting handover.
 
+        The returned list is maintained internally and must not be modified.
+
         Returns:
-            List of SoldVehicle objects
+            List of SoldVehicle objects, ordered by sold slot
         """
-        return [v for v in self.sold_vehicles if v is not None]
+        return self._sold_dense
 
     def release_slot(self, slot_number: int) -> bool:
         """
@@ -436,10 +618,14 @@ class KeySlotManager:
         if not 0 <= slot_number < self.total_slots:
             return False
 
-        if self.slots[slot_number] is None:
+        assignment = self.slots[slot_number]
+        if assignment is None:
             return False
 
+        self._license_plate_index.pop(assignment.normalized_plate, None)
         self.slots[slot_number] = None
+        self._occupied -= 1
+        self._free.add(slot_number)
         return True
 
     def release_by_license_plate(self, license_plate: str) -> bool:
@@ -452,11 +638,11 @@ class KeySlotManager:
         Returns:
             True if released, False otherwise
         """
-        assignment = self.get_vehicle_by_license_plate(license_plate)
-        if assignment is None:
+        slot_number = self._find_location(license_plate, "slot")
+        if slot_number is None:
             return False
 
-        return self.release_slot(assignment.slot_number)
+        return self.release_slot(slot_number)
 
     def get_slot_assignment(self, slot_number: int) -> Optional[SlotAssignment]:
         """
@@ -486,16 +672,11 @@ class KeySlotManager:
         Returns:
             SlotAssignment object or None if not found
         """
-        normalized = self._normalize_license_plate(license_plate)
-
-        for assignment in self.slots.values():
-            if assignment is not None:
-                if self._normalize_license_plate(
-                    assignment.license_plate
-                ) == normalized:
-                    return assignment
+        slot_number = self._find_location(license_plate, "slot")
+        if slot_number is None:
+            return None
 
-        return None
+        return self.slots[slot_number]
 
     def vehicle_exists_anywhere(self, license_plate: str) -> bool:
         """
@@ -507,25 +688,7 @@ class KeySlotManager:
         Returns:
             True if vehicle exists anywhere in the system, False otherwise
         """
-        normalized = self._normalize_license_plate(license_plate)
-
-        # Check in normal slots
-        for assignment in self.slots.values():
-            if assignment is not None:
-                if self._normalize_license_plate(
-                    assignment.license_plate
-                ) == normalized:
-                    return True
-
-        # Check in sold vehicles
-        for sold_vehicle in self.sold_vehicles:
-            if sold_vehicle is not None:
-                if self._normalize_license_plate(
-                    sold_vehicle.license_plate
-                ) == normalized:
-                    return True
-
-        return False
+        return self.is_duplicate_license_plate(license_plate)
 
     def get_available_slots_count(self) -> int:
         """
@@ -534,7 +697,7 @@ class KeySlotManager:
         Returns:
             Number of available slots
         """
-        return sum(1 for assignment in self.slots.values() if assignment is None)
+        return self.total_slots - self._occupied
 
     def get_occupied_slots_count(self) -> int:
         """
@@ -543,7 +706,7 @@ class KeySlotManager:
         Returns:
             Number of occupied slots
         """
-        return self.total_slots - self.get_available_slots_count()
+        return self._occupied
 
     def get_sold_vehicles_count(self) -> int:
         """
@@ -552,13 +715,13 @@ class KeySlotManager:
         Returns:
             Number of sold vehicles
         """
-        return sum(1 for v in self.sold_vehicles if v is not None)
+        return self._sold_count
 
     def get_all_assignments(self) -> List[SlotAssignment]:
         """
         Get all current slot assignments.
 
         Returns:
-            List of SlotAssignment objects
+            List of SlotAssignment objects, ordered by slot number
         """
-        return [a for a in self.slots.values() if a is not None]
+        return [a for a in self.slots if a is not None]
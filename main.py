@@ -4,6 +4,7 @@ Main Entry Point for Key Management Application.
 This script provides a command-line interface for the key management system.
 """
 
+import logging
 import sys
 from key_management_app import KeyManagementApp
 
@@ -12,6 +13,8 @@ def main():
     """
     Main entry point for the application.
     """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     app = KeyManagementApp()
 
     # Authenticate with Autoflex10 API
@@ -0,0 +1,70 @@
+"""
+Read/Write Lock Module.
+
+Provides a lock that lets many readers share access while writers get
+exclusive access.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class ReadWriteLock:
+    """
+    Lock allowing many concurrent readers or a single writer.
+
+    Writers are preferred: once a writer is waiting, new readers block until
+    it has finished, so a steady stream of readers cannot starve it. The
+    lock is not reentrant.
+    """
+
+    def __init__(self):
+        """Initialize an unlocked read/write lock."""
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """
+        Hold the lock for shared (read) access.
+
+        Yields:
+            None while the read lock is held
+        """
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """
+        Hold the lock for exclusive (write) access.
+
+        Yields:
+            None while the write lock is held
+        """
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
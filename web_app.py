@@ -5,14 +5,61 @@ Provides a responsive web interface for managing vehicle keys.
 Features automatic synchronization with Autoflex10 API.
 """
 
+import logging
 import threading
 import time
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request
-from autoflex_api_client import AutoflexAPIClient
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Tuple
+from flask import Flask, Response, render_template, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from key_management_app import KeyManagementApp
+from key_slot_manager import SlotAssignment, SoldVehicle
+from read_write_lock import ReadWriteLock
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(o: Any) -> Any:
+    """Encode datetimes as ISO 8601 and defer everything else to Flask."""
+    if isinstance(o, datetime):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson when it is installed.
+
+    Datetimes are written as ISO 8601 strings with either backend.
+    """
+
+    default = staticmethod(_json_default)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+
+        # response() passes compact separators or indent=2; orjson output
+        # is already compact, so only the indent needs translating
+        kwargs.pop('separators', None)
+        option = orjson.OPT_INDENT_2 if kwargs.pop('indent', None) else 0
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_json_default, option=option).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
 
 app = Flask(__name__)
+app.json = JSONProvider(app)
+app.json.compact = True
 
 # Global app instance (initialized on first request)
 key_app = None
@@ -24,67 +71,172 @@ last_sync_time = None
 last_sync_result = None
 sync_thread = None
 sync_lock = threading.Lock()
+sync_stop = threading.Event()
+
+# Guards slot state: GET routes read it concurrently, while sync and the
+# mutation routes take it exclusively
+state_lock = ReadWriteLock()
+
+# Pre-rendered JSON for the polled GET routes, keyed by route name and
+# tagged with the cache version they were rendered at
+_cache_version = 0
+_json_cache: Dict[str, Tuple[int, Any]] = {}
+
+
+# Shared stand-in for vehicles without extra data
+_EMPTY: Dict[str, Any] = {}
+
+
+def _slot_row(a: SlotAssignment) -> Dict[str, Any]:
+    """Serialize a SlotAssignment for /api/slots."""
+    vd = a.vehicle_data or _EMPTY
+    return {
+        'slot': a.slot_number,
+        'license_plate': a.license_plate,
+        'purchase_price': a.purchase_price,
+        'brand': vd.get('brand', ''),
+        'model': vd.get('model', ''),
+        'color': vd.get('color', ''),
+        'assigned_at': a.assigned_at
+    }
+
+
+def _sold_row(s: SoldVehicle) -> Dict[str, Any]:
+    """Serialize a SoldVehicle for /api/sold."""
+    vd = s.vehicle_data or _EMPTY
+    return {
+        'sold_slot': s.sold_slot,
+        'license_plate': s.license_plate,
+        'purchase_price': s.purchase_price,
+        'sold_price': s.sold_price,
+        'original_slot': s.original_slot,
+        'sold_at': s.sold_at,
+        'brand': vd.get('brand', ''),
+        'model': vd.get('model', ''),
+        'color': vd.get('color', '')
+    }
 
 
 def get_app():
     """Get or create the KeyManagementApp instance."""
     global key_app
     if key_app is None:
-        key_app = KeyManagementApp(
-            api_client=AutoflexAPIClient(
-                api_key='276AB0BF-FC21-48B1-BF97-131D2B1FA3A1',
-                username='88888-autobedrijfhelder-api',
-                password='kIE9iiAVK15SGm'
-            )
-        )
+        # Credentials come from the AUTOFLEX_* environment variables (or .env)
+        key_app = KeyManagementApp()
     return key_app
 
 
+def _invalidate_json_cache():
+    """Mark all pre-rendered JSON payloads as stale."""
+    global _cache_version
+    _cache_version += 1
+
+
+@contextmanager
+def _state_write() -> Iterator[None]:
+    """Hold the state write lock and mark cached JSON stale on release."""
+    with state_lock.write():
+        try:
+            yield
+        finally:
+            _invalidate_json_cache()
+
+
+def _cached_json(name: str, build: Callable[[], Any]) -> Response:
+    """
+    Return a JSON response, re-rendering it only after a mutation.
+
+    Args:
+        name: Cache key for the payload
+        build: Callable producing the JSON-serializable payload
+
+    Returns:
+        Response with the cached or freshly rendered payload
+    """
+    cached = _json_cache.get(name)
+    if cached is None or cached[0] != _cache_version:
+        with state_lock.read():
+            version = _cache_version
+            cached = (version, app.json.dumps(build()))
+        _json_cache[name] = cached
+    return Response(cached[1], mimetype='application/json')
+
+
 def perform_sync():
     """Perform synchronization with Autoflex10."""
+    with sync_lock:
+        return _perform_sync_locked()
+
+
+def _perform_sync_locked():
+    """Run a sync; the caller must hold sync_lock."""
     global last_sync_time, last_sync_result
 
-    with sync_lock:
-        key_mgmt = get_app()
-
-        # Authenticate first
-        if not key_mgmt.authenticate():
-            last_sync_result = {'success': False, 'error': 'Authentication failed'}
-            return last_sync_result
-
-        result = key_mgmt.sync_vehicles_from_autoflex()
-        last_sync_time = datetime.now()
-        last_sync_result = {
-            'success': True,
-            'timestamp': last_sync_time.isoformat(),
-            **result
-        }
-        print(f"[Auto-Sync] {last_sync_time}: {result['added']} added, "
-              f"{result['sold_detected']} sold detected, {result['skipped']} skipped")
+    key_mgmt = get_app()
+
+    # Reuse the current token and only authenticate when it has expired
+    authenticated = key_mgmt.ensure_authenticated()
+    _invalidate_json_cache()
+    if not authenticated:
+        last_sync_result = {'success': False, 'error': 'Authentication failed'}
         return last_sync_result
 
+    # Pages are fetched outside the write lock, so polls only wait while a
+    # page is applied and see each page's changes as soon as it lands
+    result = key_mgmt.sync_vehicles_from_autoflex(page_lock=_state_write)
+    last_sync_time = datetime.now()
+    last_sync_result = {
+        'success': True,
+        'timestamp': last_sync_time,
+        **result
+    }
+    print(f"[Auto-Sync] {last_sync_time}: {result['added']} added, "
+          f"{result['sold_detected']} sold detected, {result['skipped']} skipped")
+    return last_sync_result
+
 
 def auto_sync_worker():
     """Background worker for automatic synchronization."""
+    next_run = time.monotonic()
     while AUTO_SYNC_ENABLED:
-        try:
-            perform_sync()
-        except Exception as e:
-            print(f"[Auto-Sync] Error: {e}")
-
-        # Wait for next sync interval
-        time.sleep(AUTO_SYNC_INTERVAL)
+        # Skip the tick instead of queueing behind a sync that is still running
+        if sync_lock.acquire(blocking=False):
+            try:
+                _perform_sync_locked()
+            except Exception as e:
+                print(f"[Auto-Sync] Error: {e}")
+            finally:
+                sync_lock.release()
+        else:
+            print("[Auto-Sync] Sync already in progress, skipping this run")
+
+        # Schedule from the planned start so runs don't drift, and coalesce
+        # ticks that were missed while a slow sync was running
+        next_run += AUTO_SYNC_INTERVAL
+        now = time.monotonic()
+        if next_run <= now:
+            next_run = now + AUTO_SYNC_INTERVAL
+
+        # Wait for next sync interval, waking early if stopped
+        if sync_stop.wait(next_run - now):
+            break
 
 
 def start_auto_sync():
     """Start the automatic sync background thread."""
     global sync_thread
     if sync_thread is None or not sync_thread.is_alive():
+        sync_stop.clear()
         sync_thread = threading.Thread(target=auto_sync_worker, daemon=True)
         sync_thread.start()
         print(f"[Auto-Sync] Started with interval of {AUTO_SYNC_INTERVAL} seconds")
 
 
+def stop_auto_sync():
+    """Stop the automatic sync background thread."""
+    sync_stop.set()
+
+
 @app.route('/')
 def index():
     """Render the main page."""
@@ -95,7 +247,7 @@ def index():
 def api_status():
     """Get system status."""
     key_mgmt = get_app()
-    return jsonify(key_mgmt.get_system_status())
+    return _cached_json('status', key_mgmt.get_system_status)
 
 
 @app.route('/api/sync', methods=['POST'])
@@ -116,7 +268,7 @@ def api_sync_status():
         'auto_sync_enabled': AUTO_SYNC_ENABLED,
         'sync_interval_seconds': AUTO_SYNC_INTERVAL,
         'sync_interval_minutes': AUTO_SYNC_INTERVAL // 60,
-        'last_sync_time': last_sync_time.isoformat() if last_sync_time else None,
+        'last_sync_time': last_sync_time,
         'last_sync_result': last_sync_result
     })
 
@@ -124,68 +276,34 @@ def api_sync_status():
 @app.route('/api/slots')
 def api_slots():
     """Get all slot assignments."""
+    return _cached_json('slots', _build_slots)
+
+
+def _build_slots():
+    """Build the /api/slots payload."""
     key_mgmt = get_app()
-    assignments = key_mgmt.slot_manager.get_all_assignments()
-
-    slots = []
-    for a in assignments:
-        brand = ''
-        model = ''
-        color = ''
-        if a.vehicle_data:
-            brand = a.vehicle_data.get('brand', '')
-            model = a.vehicle_data.get('model', '')
-            color = a.vehicle_data.get('color', '')
-
-        slots.append({
-            'slot': a.slot_number,
-            'license_plate': a.license_plate,
-            'purchase_price': a.purchase_price,
-            'brand': brand,
-            'model': model,
-            'color': color,
-            'assigned_at': a.assigned_at.isoformat()
-        })
-
-    return jsonify(sorted(slots, key=lambda x: x['slot']))
+    # Assignments already come back in slot order
+    return [_slot_row(a) for a in key_mgmt.slot_manager.get_all_assignments()]
 
 
 @app.route('/api/sold')
 def api_sold():
     """Get sold vehicles awaiting handover."""
+    return _cached_json('sold', _build_sold)
+
+
+def _build_sold():
+    """Build the /api/sold payload."""
     key_mgmt = get_app()
-    sold = key_mgmt.get_sold_vehicles()
-
-    vehicles = []
-    for s in sold:
-        brand = ''
-        model = ''
-        color = ''
-        if s.vehicle_data:
-            brand = s.vehicle_data.get('brand', '')
-            model = s.vehicle_data.get('model', '')
-            color = s.vehicle_data.get('color', '')
-
-        vehicles.append({
-            'sold_slot': s.sold_slot,
-            'license_plate': s.license_plate,
-            'purchase_price': s.purchase_price,
-            'sold_price': s.sold_price,
-            'original_slot': s.original_slot,
-            'sold_at': s.sold_at.isoformat(),
-            'brand': brand,
-            'model': model,
-            'color': color
-        })
-
-    return jsonify(vehicles)
+    return [_sold_row(s) for s in key_mgmt.get_sold_vehicles()]
 
 
 @app.route('/api/search/<license_plate>')
 def api_search(license_plate):
     """Search for a vehicle by license plate."""
     key_mgmt = get_app()
-    result = key_mgmt.find_vehicle(license_plate)
+    with state_lock.read():
+        result = key_mgmt.find_vehicle(license_plate)
 
     if result is None:
         return jsonify({'found': False})
@@ -208,13 +326,16 @@ def api_add_vehicle():
     if not license_plate:
         return jsonify({'success': False, 'error': 'Kenteken is verplicht'}), 400
 
-    slot = key_mgmt.add_vehicle_manually(
-        license_plate=license_plate,
-        purchase_price=purchase_price,
-        brand=brand,
-        model=model,
-        color=color
-    )
+    with state_lock.write():
+        slot = key_mgmt.add_vehicle_manually(
+            license_plate=license_plate,
+            purchase_price=purchase_price,
+            brand=brand,
+            model=model,
+            color=color
+        )
+        if slot is not None:
+            _invalidate_json_cache()
 
     if slot is not None:
         return jsonify({'success': True, 'slot': slot})
@@ -238,11 +359,14 @@ def api_sell():
     if sold_price:
         sold_price = float(sold_price)
 
-    success = key_mgmt.sell_vehicle(
-        license_plate=license_plate,
-        sold_price=sold_price,
-        buyer_name=buyer_name
-    )
+    with state_lock.write():
+        success = key_mgmt.sell_vehicle(
+            license_plate=license_plate,
+            sold_price=sold_price,
+            buyer_name=buyer_name
+        )
+        if success:
+            _invalidate_json_cache()
 
     if success:
         return jsonify({'success': True})
@@ -261,7 +385,10 @@ def api_handover():
 
     license_plate = data.get('license_plate', '').strip()
 
-    success = key_mgmt.complete_handover(license_plate)
+    with state_lock.write():
+        success = key_mgmt.complete_handover(license_plate)
+        if success:
+            _invalidate_json_cache()
 
     if success:
         return jsonify({'success': True})
@@ -273,6 +400,8 @@ def api_handover():
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     # Start auto-sync in background
     start_auto_sync()
 
@@ -280,5 +409,10 @@ if __name__ == '__main__':
     print("[Startup] Running initial sync...")
     perform_sync()
 
-    app.run(debug=True, host='0.0.0.0', port=5050, use_reloader=False)
+    try:
+        from waitress import serve
+    except ImportError:
+        app.run(debug=True, host='0.0.0.0', port=5050, use_reloader=False)
+    else:
+        serve(app, host='0.0.0.0', port=5050, threads=8)
 